@@ -1,15 +1,26 @@
+from collections import OrderedDict
 from typing import Optional, Any, List
+import hashlib
+import itertools
 import logging
+import time
 
 from fastapi import FastAPI, Query, Request, HTTPException  # pyright: ignore[reportMissingImports]
+from fastapi.encoders import jsonable_encoder  # pyright: ignore[reportMissingImports]
 from fastapi.middleware.cors import CORSMiddleware  # pyright: ignore[reportMissingImports]
+from fastapi.responses import JSONResponse, Response  # pyright: ignore[reportMissingImports]
 from moose_lib.dmv2 import WebApp, WebAppConfig, WebAppMetadata
 from moose_lib.dmv2.web_app_helpers import get_moose_utils
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
-from app.ingest.aircraft_tracking import AircraftTrackingProcessed_Table
+from app.ingest.aircraft_tracking import (
+    AircraftTrackingProcessed_Table,
+    AircraftSpeedAltitudeByCategory_Table,
+    ALTITUDE_BUCKET_FT,
+    SPEED_BUCKET_KT,
+)
 
 app = FastAPI(
     title="Aircraft API",
@@ -39,6 +50,217 @@ class AircraftSpeedAltitudeByTypeRow(BaseModel):
     max_ground_speed: float
     speed_stddev: float
     unique_aircraft_count: int
+    """Approximate distinct aircraft count (ClickHouse uniq estimate, typically within ~1%)"""
+
+
+# Aggregation results are cached briefly: the ingest workflow only adds data
+# every 30s, so repeat dashboard polls inside that window can skip ClickHouse.
+RESULT_CACHE_TTL_SECONDS = 25
+RESULT_CACHE_MAX_ENTRIES = 256
+
+_result_cache: "OrderedDict[tuple, tuple[float, str, Any]]" = OrderedDict()
+_result_versions = itertools.count()
+
+
+def _get_cached_result(key: tuple) -> Optional[tuple[str, Any]]:
+    """Returns (etag, result) for a live cache entry, or None"""
+    entry = _result_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, etag, result = entry
+    if expires_at <= time.monotonic():
+        del _result_cache[key]
+        return None
+    _result_cache.move_to_end(key)
+    return etag, result
+
+
+def _cache_result(key: tuple, result: Any) -> str:
+    """Stores a result under key and returns its ETag"""
+    version = next(_result_versions)
+    etag = '"' + hashlib.sha1(repr((key, version)).encode()).hexdigest() + '"'
+    _result_cache[key] = (time.monotonic() + RESULT_CACHE_TTL_SECONDS, etag, result)
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > RESULT_CACHE_MAX_ENTRIES:
+        _result_cache.popitem(last=False)
+    return etag
+
+
+def _is_bucket_aligned(value: Optional[float], bucket_width: int) -> bool:
+    """True when a range bound is unset or falls on a rollup bucket edge"""
+    return value is None or value % bucket_width == 0
+
+
+# The SELECT/GROUP BY text and filter predicates only depend on table and
+# column names, so they are rendered once at import and reused per request.
+_rollup = AircraftSpeedAltitudeByCategory_Table.columns
+_ROLLUP_SELECT = f"""
+    SELECT
+        {_rollup.category} as aircraft_category,
+        countMerge({_rollup.records_state}) as total_records,
+        sumMerge({_rollup.alt_baro_sum_state}) / countMerge({_rollup.records_state}) as avg_barometric_altitude,
+        minMerge({_rollup.alt_baro_min_state}) as min_barometric_altitude,
+        maxMerge({_rollup.alt_baro_max_state}) as max_barometric_altitude,
+        sqrt(varPopMerge({_rollup.alt_baro_var_state})) as altitude_stddev,
+        sumMerge({_rollup.gs_sum_state}) / countMerge({_rollup.records_state}) as avg_ground_speed,
+        minMerge({_rollup.gs_min_state}) as min_ground_speed,
+        maxMerge({_rollup.gs_max_state}) as max_ground_speed,
+        sqrt(varPopMerge({_rollup.gs_var_state})) as speed_stddev,
+        uniqMerge({_rollup.unique_aircraft_state}) as unique_aircraft_count
+    FROM {AircraftSpeedAltitudeByCategory_Table.name}
+"""
+_ROLLUP_GROUP_ORDER = f"""
+    GROUP BY {_rollup.category}
+    ORDER BY total_records DESC
+"""
+_ROLLUP_CATEGORY = f"{_rollup.category} = {{category:String}}"
+_ROLLUP_MIN_ALTITUDE = f"{_rollup.alt_baro_bucket_floor} >= {{min_altitude:Float64}}"
+_ROLLUP_MAX_ALTITUDE = f"{_rollup.alt_baro_bucket_ceil} <= {{max_altitude:Float64}}"
+_ROLLUP_MIN_SPEED = f"{_rollup.gs_bucket_floor} >= {{min_speed:Float64}}"
+_ROLLUP_MAX_SPEED = f"{_rollup.gs_bucket_ceil} <= {{max_speed:Float64}}"
+
+# Same derived metrics as the rollup: averages share the single row count
+# instead of each AVG keeping its own count, and stddev is sqrt(varPop).
+_source = AircraftTrackingProcessed_Table.columns
+_RAW_SELECT = f"""
+    SELECT
+        {_source.category} as aircraft_category,
+        count() as total_records,
+        sum({_source.alt_baro}) / count() as avg_barometric_altitude,
+        min({_source.alt_baro}) as min_barometric_altitude,
+        max({_source.alt_baro}) as max_barometric_altitude,
+        sqrt(varPop({_source.alt_baro})) as altitude_stddev,
+        sum({_source.gs}) / count() as avg_ground_speed,
+        min({_source.gs}) as min_ground_speed,
+        max({_source.gs}) as max_ground_speed,
+        sqrt(varPop({_source.gs})) as speed_stddev,
+        uniq({_source.hex}) as unique_aircraft_count
+    FROM {AircraftTrackingProcessed_Table.name}
+"""
+_RAW_GROUP_ORDER = f"""
+    GROUP BY {_source.category}
+    ORDER BY total_records DESC
+"""
+# alt_baro and gs are Float32 columns, so bounds are bound as Float32 too;
+# widening the column to Float64 would miss rows stored at the bound itself.
+_RAW_CATEGORY = f"{_source.category} = {{category:String}}"
+_RAW_HAS_CATEGORY = f"{_source.category} != ''"
+_RAW_MIN_ALTITUDE = f"{_source.alt_baro} >= {{min_altitude:Float32}}"
+_RAW_POSITIVE_ALTITUDE = f"{_source.alt_baro} > 0"
+_RAW_MAX_ALTITUDE = f"{_source.alt_baro} <= {{max_altitude:Float32}}"
+_RAW_MIN_SPEED = f"{_source.gs} >= {{min_speed:Float32}}"
+_RAW_POSITIVE_SPEED = f"{_source.gs} > 0"
+_RAW_MAX_SPEED = f"{_source.gs} <= {{max_speed:Float32}}"
+
+
+def _build_rollup_query(
+    category: Optional[str],
+    minAltitude: Optional[float],
+    maxAltitude: Optional[float],
+    minSpeed: Optional[float],
+    maxSpeed: Optional[float],
+) -> tuple[str, dict[str, Any]]:
+    """Builds the statistics query against the pre-aggregated rollup table.
+    Only valid when every range bound is bucket-aligned (see _is_bucket_aligned).
+    """
+    # The view only holds rows with positive altitude and speed, so
+    # non-positive lower bounds are always satisfied and are left out.
+    conditions: List[str] = []
+    parameters: dict[str, Any] = {}
+    if category:
+        conditions.append(_ROLLUP_CATEGORY)
+        parameters["category"] = category
+    if minAltitude is not None and minAltitude > 0:
+        conditions.append(_ROLLUP_MIN_ALTITUDE)
+        parameters["min_altitude"] = minAltitude
+    if maxAltitude is not None:
+        conditions.append(_ROLLUP_MAX_ALTITUDE)
+        parameters["max_altitude"] = maxAltitude
+    if minSpeed is not None and minSpeed > 0:
+        conditions.append(_ROLLUP_MIN_SPEED)
+        parameters["min_speed"] = minSpeed
+    if maxSpeed is not None:
+        conditions.append(_ROLLUP_MAX_SPEED)
+        parameters["max_speed"] = maxSpeed
+
+    where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return _ROLLUP_SELECT + where_clause + _ROLLUP_GROUP_ORDER, parameters
+
+
+def _build_raw_query(
+    category: Optional[str],
+    minAltitude: Optional[float],
+    maxAltitude: Optional[float],
+    minSpeed: Optional[float],
+    maxSpeed: Optional[float],
+) -> tuple[str, dict[str, Any]]:
+    """Builds the statistics query against the full processed tracking table"""
+    # Each optional filter either implies or is implied by the matching base
+    # predicate, so emit only the stronger of the two.
+    conditions: List[str] = []
+    parameters: dict[str, Any] = {}
+    if category:
+        conditions.append(_RAW_CATEGORY)
+        parameters["category"] = category
+    else:
+        conditions.append(_RAW_HAS_CATEGORY)
+    if minAltitude is not None and minAltitude > 0:
+        conditions.append(_RAW_MIN_ALTITUDE)
+        parameters["min_altitude"] = minAltitude
+    else:
+        conditions.append(_RAW_POSITIVE_ALTITUDE)
+    if maxAltitude is not None:
+        conditions.append(_RAW_MAX_ALTITUDE)
+        parameters["max_altitude"] = maxAltitude
+    if minSpeed is not None and minSpeed > 0:
+        conditions.append(_RAW_MIN_SPEED)
+        parameters["min_speed"] = minSpeed
+    else:
+        conditions.append(_RAW_POSITIVE_SPEED)
+    if maxSpeed is not None:
+        conditions.append(_RAW_MAX_SPEED)
+        parameters["max_speed"] = maxSpeed
+
+    return _RAW_SELECT + " WHERE " + " AND ".join(conditions) + _RAW_GROUP_ORDER, parameters
+
+
+def run_speed_altitude_query(
+    client: Any,
+    category: Optional[str],
+    minAltitude: Optional[float],
+    maxAltitude: Optional[float],
+    minSpeed: Optional[float],
+    maxSpeed: Optional[float],
+) -> tuple[str, Any]:
+    """Runs the speed/altitude statistics query through the result cache.
+    Shared entry point for every handler that serves these statistics; returns (etag, rows).
+    """
+    cache_key = (category or None, minAltitude, maxAltitude, minSpeed, maxSpeed)
+    cached = _get_cached_result(cache_key)
+    if cached is not None:
+        return cached
+
+    # Serve from the rollup when the range bounds line up with its buckets;
+    # otherwise scan the processed table directly.
+    if (
+        _is_bucket_aligned(minAltitude, ALTITUDE_BUCKET_FT)
+        and _is_bucket_aligned(maxAltitude, ALTITUDE_BUCKET_FT)
+        and _is_bucket_aligned(minSpeed, SPEED_BUCKET_KT)
+        and _is_bucket_aligned(maxSpeed, SPEED_BUCKET_KT)
+    ):
+        query, parameters = _build_rollup_query(category, minAltitude, maxAltitude, minSpeed, maxSpeed)
+    else:
+        query, parameters = _build_raw_query(category, minAltitude, maxAltitude, minSpeed, maxSpeed)
+
+    # Execute query and get results
+    result = client.query.execute_raw(query, parameters=parameters)
+
+    # Handle result - some implementations return a wrapper with .json() method
+    if hasattr(result, "json") and callable(getattr(result, "json")):
+        result = result.json()
+
+    result = jsonable_encoder(result)
+    return _cache_result(cache_key, result), result
 
 
 @app.get("/aircraftSpeedAltitudeByType")
@@ -59,46 +281,14 @@ async def aircraftSpeedAltitudeByType(
         if not moose:
             raise HTTPException(status_code=500, detail="MooseStack utilities not available")
         
-        source = AircraftTrackingProcessed_Table
-        
-        query = f"""
-            SELECT 
-                {source.columns.category} as aircraft_category,
-                COUNT(*) as total_records,
-                AVG({source.columns.alt_baro}) as avg_barometric_altitude,
-                MIN({source.columns.alt_baro}) as min_barometric_altitude,
-                MAX({source.columns.alt_baro}) as max_barometric_altitude,
-                STDDEV_POP({source.columns.alt_baro}) as altitude_stddev,
-                AVG({source.columns.gs}) as avg_ground_speed,
-                MIN({source.columns.gs}) as min_ground_speed,
-                MAX({source.columns.gs}) as max_ground_speed,
-                STDDEV_POP({source.columns.gs}) as speed_stddev,
-                COUNT(DISTINCT {source.columns.hex}) as unique_aircraft_count
-            FROM {source.name} 
-            WHERE {source.columns.alt_baro} > 0 
-                AND {source.columns.gs} > 0 
-                AND {source.columns.category} != ''
-                -- Optional category filter
-                AND ('{category or ''}' = '' OR {source.columns.category} = '{category or ''}')
-                -- Optional altitude range filters
-                AND ({minAltitude or -999999} = -999999 OR {source.columns.alt_baro} >= {minAltitude or -999999})
-                AND ({maxAltitude or 999999} = 999999 OR {source.columns.alt_baro} <= {maxAltitude or 999999})
-                -- Optional speed range filters
-                AND ({minSpeed or -999999} = -999999 OR {source.columns.gs} >= {minSpeed or -999999})
-                AND ({maxSpeed or 999999} = 999999 OR {source.columns.gs} <= {maxSpeed or 999999})
-            GROUP BY {source.columns.category} 
-            ORDER BY total_records DESC
-        """
-
-        # Execute query and get results
-        result = moose.client.query.execute_raw(query, parameters={})
-
-        # Handle result - some implementations return a wrapper with .json() method
-        if hasattr(result, "json") and callable(getattr(result, "json")):
-            return result.json()
-
-        return result
-        
+        etag, result = run_speed_altitude_query(
+            moose.client, category, minAltitude, maxAltitude, minSpeed, maxSpeed
+        )
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        return JSONResponse(content=result, headers={"ETag": etag})
+
     except HTTPException:
         raise
     except Exception as e:
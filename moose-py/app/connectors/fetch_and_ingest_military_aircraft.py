@@ -1,79 +1,196 @@
 import asyncio
+import datetime
 import aiohttp
-from typing import List, Dict, Any, Optional
+import msgspec
+import orjson
+from typing import List, Dict, Any, AsyncGenerator, Optional, Union
 from moose_lib import Task, Workflow, TaskConfig, WorkflowConfig
 from pydantic import BaseModel
 from app.datamodels.models import AircraftTrackingData
 
+INGEST_URL = "http://localhost:4000/ingest/AircraftTrackingDataIngestAPI"
+INGEST_BATCH_SIZE = 100
+INGEST_CONCURRENCY = 8
 
-class ApiResponse:
-    """Interface for API response from adsb.lol"""
-    def __init__(self, ac: List[Dict[str, Any]], total: Optional[int] = None, 
-                 ctime: Optional[int] = None, ptime: Optional[int] = None):
-        self.ac = ac
-        self.total = total
-        self.ctime = ctime
-        self.ptime = ptime
 
-def map_to_aircraft_tracking_data(aircraft: Dict[str, Any], timestamp: str) -> AircraftTrackingData:
+class ApiAircraft(msgspec.Struct, kw_only=True):
+    """Aircraft record as returned by adsb.lol; fields missing from the payload take these defaults"""
+    hex: str = ""
+    transponder_type: str = ""
+    flight: str = ""
+    r: str = ""
+    aircraft_type: Optional[str] = None
+    dbFlags: int = 0
+    lat: float = 0.0
+    lon: float = 0.0
+    alt_baro: Union[float, str, None] = None
+    alt_geom: float = 0.0
+    gs: float = 0.0
+    track: float = 0.0
+    baro_rate: float = 0.0
+    geom_rate: Optional[float] = None
+    squawk: str = ""
+    emergency: str = ""
+    category: str = ""
+    nav_qnh: Optional[float] = None
+    nav_altitude_mcp: Optional[float] = None
+    nav_heading: Optional[float] = None
+    nav_modes: Optional[List[str]] = None
+    nic: int = 0
+    rc: int = 0
+    seen_pos: float = 0.0
+    version: int = 0
+    nic_baro: int = 0
+    nac_p: int = 0
+    nac_v: int = 0
+    sil: int = 0
+    sil_type: str = ""
+    gva: int = 0
+    sda: int = 0
+    alert: int = 0
+    spi: int = 0
+    mlat: List[str] = []
+    tisb: List[str] = []
+    messages: int = 0
+    seen: float = 0.0
+    rssi: float = 0.0
+
+
+class ApiResponse(msgspec.Struct):
+    """Interface for API response from adsb.lol.
+    Aircraft are kept as raw JSON so a malformed record only drops that record.
+    """
+    ac: Optional[List[msgspec.Raw]] = None
+    total: Optional[int] = None
+    ctime: Optional[int] = None
+    ptime: Optional[int] = None
+
+
+_response_decoder = msgspec.json.Decoder(ApiResponse)
+_aircraft_decoder = msgspec.json.Decoder(ApiAircraft, strict=False)
+
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_session_closer: Optional[AsyncGenerator[None, None]] = None
+
+
+async def _close_with_loop(session: aiohttp.ClientSession) -> AsyncGenerator[None, None]:
+    """Async generator that stays suspended for the session's lifetime.
+    Event loops close their open async generators on shutdown (asyncio.run does
+    this before closing the loop), which runs the close inside the owning loop.
+    """
+    try:
+        yield
+    finally:
+        await session.close()
+
+
+async def _ensure_session() -> aiohttp.ClientSession:
+    """Returns the module-wide HTTP session, creating it on first use or when the event loop changed.
+    Reuse only spans runs on the same event loop; a runner that gives every run
+    a new loop gets a new session each time, and the old one is closed when its
+    loop shuts down.
+    """
+    global _session, _session_loop, _session_closer
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        if _session is not None and not _session.closed and _session_loop is not None:
+            # The owning loop is still alive elsewhere, so close the session there
+            if _session_loop.is_running():
+                asyncio.run_coroutine_threadsafe(_session.close(), _session_loop)
+            print("Recreating HTTP session: workflow run is on a new event loop")
+        _session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30),
+            connector=aiohttp.TCPConnector(limit_per_host=32, keepalive_timeout=60, ttl_dns_cache=300),
+        )
+        _session_loop = loop
+        _session_closer = _close_with_loop(_session)
+        await _session_closer.__anext__()
+    return _session
+
+
+def map_to_aircraft_tracking_data(aircraft: ApiAircraft, timestamp: datetime.datetime) -> AircraftTrackingData:
     """Maps API aircraft data to AircraftTrackingData format"""
     # Handle alt_baro which can be "ground" or a number
-    alt_baro = 0
-    alt_baro_is_ground = False
-
-    if isinstance(aircraft.get("alt_baro"), str) and aircraft["alt_baro"] == "ground":
-        alt_baro = 0  # Set to 0 for ground
-        alt_baro_is_ground = True
-    elif isinstance(aircraft.get("alt_baro"), (int, float)) and aircraft["alt_baro"] == 0:
-        alt_baro_is_ground = True
-    else:
-        alt_baro = aircraft.get("alt_baro", 0) or 0
-
-    return AircraftTrackingData(
-        hex=aircraft.get("hex", ""),
-        transponder_type=aircraft.get("transponder_type", ""),
-        flight=aircraft.get("flight", ""),
-        r=aircraft.get("r", ""),
-        aircraft_type=aircraft.get("aircraft_type"),
-        dbFlags=aircraft.get("dbFlags", 0),
-        lat=aircraft.get("lat", 0),
-        lon=aircraft.get("lon", 0),
+    raw_alt_baro = aircraft.alt_baro
+    alt_baro_is_ground = raw_alt_baro == "ground" or raw_alt_baro == 0
+    alt_baro = 0.0 if (alt_baro_is_ground or raw_alt_baro is None) else float(raw_alt_baro)
+
+    # The struct has already been type-checked by msgspec, so skip re-validating it
+    return AircraftTrackingData.model_construct(
+        hex=aircraft.hex,
+        transponder_type=aircraft.transponder_type,
+        flight=aircraft.flight,
+        r=aircraft.r,
+        aircraft_type=aircraft.aircraft_type,
+        dbFlags=aircraft.dbFlags,
+        lat=aircraft.lat,
+        lon=aircraft.lon,
         alt_baro=alt_baro,
         alt_baro_is_ground=alt_baro_is_ground,
-        alt_geom=aircraft.get("alt_geom", 0),
-        gs=aircraft.get("gs", 0),
-        track=aircraft.get("track", 0),
-        baro_rate=aircraft.get("baro_rate", 0),
-        geom_rate=aircraft.get("geom_rate"),
-        squawk=aircraft.get("squawk", ""),
-        emergency=aircraft.get("emergency", ""),
-        category=aircraft.get("category", ""),
-        nav_qnh=aircraft.get("nav_qnh"),
-        nav_altitude_mcp=aircraft.get("nav_altitude_mcp"),
-        nav_heading=aircraft.get("nav_heading"),
-        nav_modes=aircraft.get("nav_modes"),
-        nic=aircraft.get("nic", 0),
-        rc=aircraft.get("rc", 0),
-        seen_pos=int(aircraft.get("seen_pos", 0)),
-        version=aircraft.get("version", 0),
-        nic_baro=aircraft.get("nic_baro", 0),
-        nac_p=aircraft.get("nac_p", 0),
-        nac_v=aircraft.get("nac_v", 0),
-        sil=aircraft.get("sil", 0),
-        sil_type=aircraft.get("sil_type", ""),
-        gva=aircraft.get("gva", 0),
-        sda=aircraft.get("sda", 0),
-        alert=aircraft.get("alert", 0),
-        spi=aircraft.get("spi", 0),
-        mlat=aircraft.get("mlat", []),
-        tisb=aircraft.get("tisb", []),
-        messages=aircraft.get("messages", 0),
-        seen=int(aircraft.get("seen", 0)),
-        rssi=aircraft.get("rssi", 0),
+        alt_geom=aircraft.alt_geom,
+        gs=aircraft.gs,
+        track=aircraft.track,
+        baro_rate=aircraft.baro_rate,
+        geom_rate=aircraft.geom_rate,
+        squawk=aircraft.squawk,
+        emergency=aircraft.emergency,
+        category=aircraft.category,
+        nav_qnh=aircraft.nav_qnh,
+        nav_altitude_mcp=aircraft.nav_altitude_mcp,
+        nav_heading=aircraft.nav_heading,
+        nav_modes=aircraft.nav_modes,
+        nic=aircraft.nic,
+        rc=aircraft.rc,
+        seen_pos=int(aircraft.seen_pos),
+        version=aircraft.version,
+        nic_baro=aircraft.nic_baro,
+        nac_p=aircraft.nac_p,
+        nac_v=aircraft.nac_v,
+        sil=aircraft.sil,
+        sil_type=aircraft.sil_type,
+        gva=aircraft.gva,
+        sda=aircraft.sda,
+        alert=aircraft.alert,
+        spi=aircraft.spi,
+        mlat=aircraft.mlat,
+        tisb=aircraft.tisb,
+        messages=aircraft.messages,
+        seen=int(aircraft.seen),
+        rssi=aircraft.rssi,
         timestamp=timestamp,
     )
 
 
+async def ingest_batches(session: aiohttp.ClientSession, payloads: List[Dict[str, Any]]) -> int:
+    """Posts payloads to the ingestion endpoint in concurrent batches; returns how many were accepted"""
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+    async def post_batch(batch: List[Dict[str, Any]]) -> int:
+        async with semaphore:
+            async with session.post(
+                INGEST_URL,
+                data=orjson.dumps(batch),
+                headers={"Content-Type": "application/json"}
+            ) as ingest_response:
+                if ingest_response.ok:
+                    return len(batch)
+                print(f"Failed to ingest {len(batch)} aircraft records: {ingest_response.status} {ingest_response.reason}")
+                return 0
+
+    batches = [payloads[i:i + INGEST_BATCH_SIZE] for i in range(0, len(payloads), INGEST_BATCH_SIZE)]
+    results = await asyncio.gather(*(post_batch(batch) for batch in batches), return_exceptions=True)
+
+    processed_count = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"Error ingesting aircraft batch: {result}")
+        else:
+            processed_count += result
+    return processed_count
+
+
 async def fetch_and_ingest_military_aircraft_task(context) -> None:
     """Task to fetch military aircraft data from adsb.lol API and ingest it"""
     try:
@@ -81,46 +198,39 @@ async def fetch_and_ingest_military_aircraft_task(context) -> None:
 
         print(f"Fetching military aircraft data from {api_url}")
 
-        # Fetch data from API with timeout
-        timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(api_url) as response:
-                if not response.ok:
-                    raise Exception(f"API request failed with status: {response.status} {response.reason}")
+        # Shared across workflow runs so the connection pool stays warm
+        session = await _ensure_session()
+
+        async with session.get(api_url) as response:
+            if not response.ok:
+                raise Exception(f"API request failed with status: {response.status} {response.reason}")
 
-                data = await response.json()
+            data = _response_decoder.decode(await response.read())
 
-        if not data.get("ac") or not isinstance(data["ac"], list):
+        if not data.ac:
             print("No aircraft data found in API response")
             return
 
-        print(f"Fetched {len(data['ac'])} military aircraft records")
+        print(f"Fetched {len(data.ac)} military aircraft records")
 
-        # Process each aircraft and send to ingestion endpoint
-        import datetime
-        timestamp = datetime.datetime.now().isoformat()
-        processed_count = 0
+        # Map every aircraft, then send them to the ingestion endpoint in batches
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+        payloads: List[Dict[str, Any]] = []
+        failures: List[str] = []
 
-        for aircraft in data["ac"]:
+        for index, raw_aircraft in enumerate(data.ac):
             try:
-                mapped_data = map_to_aircraft_tracking_data(aircraft, timestamp)
-
-                # Send individual aircraft data to Moose ingestion endpoint
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        "http://localhost:4000/ingest/AircraftTrackingDataIngestAPI",
-                        json=mapped_data.dict(),
-                        headers={"Content-Type": "application/json"}
-                    ) as ingest_response:
-                        if ingest_response.ok:
-                            processed_count += 1
-                        else:
-                            print(f"Failed to ingest aircraft {aircraft.get('hex')}: {ingest_response.status} {ingest_response.reason}")
-
+                aircraft = _aircraft_decoder.decode(raw_aircraft)
+                payloads.append(map_to_aircraft_tracking_data(aircraft, timestamp).model_dump(mode="json"))
             except Exception as error:
-                print(f"Error processing aircraft {aircraft.get('hex')}: {error}")
+                failures.append(f"record {index}: {error}")
+
+        if failures:
+            print(f"Failed to map {len(failures)} aircraft records: {'; '.join(failures)}")
+
+        processed_count = await ingest_batches(session, payloads)
 
-        print(f"Successfully processed {processed_count} out of {len(data['ac'])} aircraft records")
+        print(f"Successfully processed {processed_count} out of {len(data.ac)} aircraft records")
 
     except Exception as error:
         print(f"Error in fetch_and_ingest_military_aircraft task: {error}")
@@ -1,6 +1,7 @@
+from datetime import date
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
-from moose_lib import Key
+from typing import Annotated, Optional, List
+from moose_lib import Key, UInt8, UInt16, UInt32, Float32, ClickHouseAlias, aggregated, clickhouse_datetime64
 
 
 class AircraftTrackingData(BaseModel):
@@ -24,7 +25,7 @@ class AircraftTrackingData(BaseModel):
     aircraft_type: Optional[str] = None
     """Aircraft ICAO type code pulled from database (as defined by ICAO DOC8643)"""
 
-    dbFlags: int
+    dbFlags: UInt8
     """Bitfield for database flags: military = dbFlags & 1, interesting = dbFlags & 2, PIA = dbFlags & 4, LADD = dbFlags & 8"""
 
     lat: float
@@ -33,25 +34,25 @@ class AircraftTrackingData(BaseModel):
     lon: float
     """Aircraft longitude position in decimal degrees"""
 
-    alt_baro: float
+    alt_baro: Float32
     """Aircraft barometric altitude in feet. When alt_baro_is_ground is true, aircraft is on ground."""
 
     alt_baro_is_ground: bool
     """Indicates if aircraft is on ground (alt_baro would be "ground" in raw API)"""
 
-    alt_geom: float
+    alt_geom: Float32
     """Geometric (GNSS / INS) altitude in feet referenced to the WGS84 ellipsoid"""
 
-    gs: float
+    gs: Float32
     """Ground speed in knots"""
 
-    track: float
+    track: Float32
     """True track over ground in degrees (0-359)"""
 
-    baro_rate: float
+    baro_rate: Float32
     """Rate of change of barometric altitude, feet/minute"""
 
-    geom_rate: Optional[float] = None
+    geom_rate: Optional[Float32] = None
     """Rate of change of geometric (GNSS / INS) altitude, feet/minute"""
 
     squawk: str
@@ -63,55 +64,55 @@ class AircraftTrackingData(BaseModel):
     category: str
     """Emitter category to identify particular aircraft or vehicle classes (values A0-D7)"""
 
-    nav_qnh: Optional[float] = None
+    nav_qnh: Optional[Float32] = None
     """Altimeter setting (QFE or QNH/QNE), hPa"""
 
-    nav_altitude_mcp: Optional[float] = None
+    nav_altitude_mcp: Optional[Float32] = None
     """Selected altitude from the Mode Control Panel / Flight Control Unit (MCP/FCU), feet"""
 
-    nav_heading: Optional[float] = None
+    nav_heading: Optional[Float32] = None
     """Selected heading (True or Magnetic is not defined in DO-260B, mostly Magnetic)"""
 
     nav_modes: Optional[List[str]] = None
     """Set of engaged automation modes: 'autopilot', 'vnav', 'althold', 'approach', 'lnav', 'tcas'"""
 
-    nic: int
+    nic: UInt8
     """Navigation Integrity Category - measure of position accuracy"""
 
-    rc: int
+    rc: UInt16
     """Radius of Containment in meters; measure of position integrity derived from NIC & supplementary bits"""
 
-    seen_pos: int
+    seen_pos: UInt32
     """How long ago (in seconds before "now") the position was last updated"""
 
-    version: int
+    version: UInt8
     """ADS-B Version Number: 0, 1, 2 (3-7 are reserved)"""
 
-    nic_baro: int
+    nic_baro: UInt8
     """Navigation Integrity Category for Barometric Altitude"""
 
-    nac_p: int
+    nac_p: UInt8
     """Navigation Accuracy for Position"""
 
-    nac_v: int
+    nac_v: UInt8
     """Navigation Accuracy for Velocity"""
 
-    sil: int
+    sil: UInt8
     """Source Integrity Level"""
 
     sil_type: str
     """Source Integrity Level type: unknown, perhour, persample"""
 
-    gva: int
+    gva: UInt8
     """Geometric Vertical Accuracy"""
 
-    sda: int
+    sda: UInt8
     """System Design Assurance"""
 
-    alert: int
+    alert: UInt8
     """Flight status alert bit"""
 
-    spi: int
+    spi: UInt8
     """Flight status special position identification bit"""
 
     mlat: List[str]
@@ -120,17 +121,17 @@ class AircraftTrackingData(BaseModel):
     tisb: List[str]
     """List of fields derived from TIS-B data"""
 
-    messages: int
+    messages: UInt32
     """Total number of Mode S messages received from this aircraft"""
 
-    seen: int
+    seen: UInt32
     """How long ago (in seconds before "now") a message was last received from this aircraft"""
 
-    rssi: float
+    rssi: Float32
     """Recent average RSSI (signal power) in dBFS; always negative"""
 
-    timestamp: str
-    """Timestamp when this data was captured (ISO format)"""
+    timestamp: clickhouse_datetime64(3)
+    """Timestamp when this data was captured (UTC); ISO-8601 strings are accepted on ingest"""
 
 
 class AircraftTrackingProcessed(AircraftTrackingData):
@@ -142,17 +143,81 @@ class AircraftTrackingProcessed(AircraftTrackingData):
     zorderCoordinate: Key[int]
     """Z-order curve coordinate for efficient spatial queries"""
 
-    approach: bool
-    """Approach mode engaged (decoded from nav_modes)"""
+    nav_flags: UInt8
+    """Bitmask of engaged nav_modes: approach = 1, autopilot = 2, althold = 4, lnav = 8, tcas = 16, vnav = 32"""
 
-    autopilot: bool
-    """Autopilot mode engaged (decoded from nav_modes)"""
+    # The mode columns below are ClickHouse ALIAS columns computed from nav_flags at
+    # query time. They are never populated in Python and are always None on records
+    # in the stream; decode them with nav_mode_engaged(record.nav_flags, mode).
 
-    althold: bool
-    """Altitude hold mode engaged (decoded from nav_modes)"""
+    approach: Annotated[Optional[bool], ClickHouseAlias("bitAnd(nav_flags, 1) != 0")] = None
+    """Approach mode engaged (ClickHouse ALIAS of nav_flags; None in Python)"""
 
-    lnav: bool
-    """Lateral navigation mode engaged (decoded from nav_modes)"""
+    autopilot: Annotated[Optional[bool], ClickHouseAlias("bitAnd(nav_flags, 2) != 0")] = None
+    """Autopilot mode engaged (ClickHouse ALIAS of nav_flags; None in Python)"""
 
-    tcas: bool
-    """Traffic Collision Avoidance System mode engaged (decoded from nav_modes)"""
+    althold: Annotated[Optional[bool], ClickHouseAlias("bitAnd(nav_flags, 4) != 0")] = None
+    """Altitude hold mode engaged (ClickHouse ALIAS of nav_flags; None in Python)"""
+
+    lnav: Annotated[Optional[bool], ClickHouseAlias("bitAnd(nav_flags, 8) != 0")] = None
+    """Lateral navigation mode engaged (ClickHouse ALIAS of nav_flags; None in Python)"""
+
+    tcas: Annotated[Optional[bool], ClickHouseAlias("bitAnd(nav_flags, 16) != 0")] = None
+    """Traffic Collision Avoidance System mode engaged (ClickHouse ALIAS of nav_flags; None in Python)"""
+
+
+class AircraftSpeedAltitudeByCategory(BaseModel):
+    """Pre-aggregated speed and altitude statistics per aircraft category.
+    Rows are bucketed by barometric altitude and ground speed so range filters can be answered from the rollup.
+    Each bucket is keyed by both its floor and ceiling edge, which keeps inclusive lower and upper bounds exact.
+    Rows are also split by capture day so they expire on the same schedule as the tracking data.
+    """
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    category: str
+    """Emitter category to identify particular aircraft or vehicle classes (values A0-D7)"""
+
+    day: date
+    """UTC day the underlying tracking records were captured"""
+
+    alt_baro_bucket_floor: float
+    """Barometric altitude rounded down to the altitude bucket width, feet"""
+
+    alt_baro_bucket_ceil: float
+    """Barometric altitude rounded up to the altitude bucket width, feet"""
+
+    gs_bucket_floor: float
+    """Ground speed rounded down to the speed bucket width, knots"""
+
+    gs_bucket_ceil: float
+    """Ground speed rounded up to the speed bucket width, knots"""
+
+    records_state: aggregated(int, "count", [])
+    """Number of tracking records (countState)"""
+
+    alt_baro_sum_state: aggregated(float, "sum", [float])
+    """Sum of barometric altitude (sumState)"""
+
+    alt_baro_min_state: aggregated(float, "min", [float])
+    """Minimum barometric altitude (minState)"""
+
+    alt_baro_max_state: aggregated(float, "max", [float])
+    """Maximum barometric altitude (maxState)"""
+
+    alt_baro_var_state: aggregated(float, "varPop", [float])
+    """Population variance of barometric altitude (varPopState)"""
+
+    gs_sum_state: aggregated(float, "sum", [float])
+    """Sum of ground speed (sumState)"""
+
+    gs_min_state: aggregated(float, "min", [float])
+    """Minimum ground speed (minState)"""
+
+    gs_max_state: aggregated(float, "max", [float])
+    """Maximum ground speed (maxState)"""
+
+    gs_var_state: aggregated(float, "varPop", [float])
+    """Population variance of ground speed (varPopState)"""
+
+    unique_aircraft_state: aggregated(int, "uniq", [str])
+    """Approximate number of distinct aircraft hex identifiers (uniqState)"""
@@ -2,41 +2,63 @@ from app.datamodels.models import AircraftTrackingData, AircraftTrackingProcesse
 from typing import Optional, List
 
 
+def _spread_bits(value: int) -> int:
+    """Spreads the low 32 bits of value so they occupy the even bit positions"""
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+
 def calculate_z_order(lat: float, lon: float) -> int:
     """Calculate Z-order curve value for spatial indexing"""
-    # Normalize lat/lon to integers between 0 and 2^20
-    lat_int = int(((lat + 90.0) * (1 << 20)) / 180.0)
-    lon_int = int(((lon + 180.0) * (1 << 20)) / 360.0)
+    # Clamp out-of-range coordinates to the valid range
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        lat = min(max(lat, -90.0), 90.0)
+        lon = min(max(lon, -180.0), 180.0)
+
+    # Normalize lat/lon to integers between 0 and 2^20 - 1; the maximum
+    # coordinates map to 2^20 and are clamped onto the last cell of the curve
+    lat_int = min(int(((lat + 90.0) * (1 << 20)) / 180.0), 0xFFFFF)
+    lon_int = min(int(((lon + 180.0) * (1 << 20)) / 360.0), 0xFFFFF)
+
+    # Interleave bits: latitude on even positions, longitude on odd positions
+    return _spread_bits(lat_int) | (_spread_bits(lon_int) << 1)
+
+
+# Bit assigned to each nav mode in AircraftTrackingProcessed.nav_flags
+NAV_MODE_BITS = {
+    "approach": 1,
+    "autopilot": 2,
+    "althold": 4,
+    "lnav": 8,
+    "tcas": 16,
+    "vnav": 32,
+}
+
 
-    # Interleave bits
-    result = 0
-    for i in range(20):
-        result |= ((lat_int & (1 << i)) << i) | ((lon_int & (1 << i)) << (i + 1))
-    return result
+def encode_nav_modes(nav_modes: Optional[List[str]]) -> int:
+    """Converts NavModes list to a nav_flags bitmask"""
+    nav_flags = 0
+    for mode in nav_modes or ():
+        nav_flags |= NAV_MODE_BITS.get(mode, 0)
+    return nav_flags
 
 
-def parse_nav_modes(nav_modes: Optional[List[str]]) -> dict:
-    """Converts NavModes list to boolean flags"""
-    return {
-        "approach": "approach" in (nav_modes or []),
-        "autopilot": "autopilot" in (nav_modes or []),
-        "althold": "althold" in (nav_modes or []),
-        "lnav": "lnav" in (nav_modes or []),
-        "tcas": "tcas" in (nav_modes or []),
-    }
+def nav_mode_engaged(nav_flags: int, mode: str) -> bool:
+    """Checks whether a nav mode is set in a nav_flags bitmask"""
+    return bool(nav_flags & NAV_MODE_BITS[mode])
 
 
 def transform_aircraft(record: AircraftTrackingData) -> AircraftTrackingProcessed:
     """Transform raw aircraft data to processed format with additional computed fields"""
-    zorder_coordinate = calculate_z_order(record.lat, record.lon)
-    nav_flags = parse_nav_modes(record.nav_modes)
-    
-    return AircraftTrackingProcessed(
-        **record.dict(),
-        zorderCoordinate=zorder_coordinate,
-        approach=nav_flags["approach"],
-        autopilot=nav_flags["autopilot"],
-        althold=nav_flags["althold"],
-        lnav=nav_flags["lnav"],
-        tcas=nav_flags["tcas"],
+    # The incoming record has already been validated, so build the processed
+    # record without running every field through validation a second time
+    data = record.__dict__.copy()
+    data.update(
+        zorderCoordinate=calculate_z_order(record.lat, record.lon),
+        nav_flags=encode_nav_modes(record.nav_modes),
     )
+    return AircraftTrackingProcessed.model_construct(**data)
@@ -1,9 +1,17 @@
-from moose_lib import OlapTable, Stream, IngestApi, IngestConfigWithDestination, DeadLetterQueue, IngestPipeline, IngestPipelineConfig, StreamConfig
-from app.datamodels.models import AircraftTrackingData, AircraftTrackingProcessed
+from moose_lib import OlapTable, OlapConfig, Stream, IngestApi, IngestConfigWithDestination, DeadLetterQueue, IngestPipeline, IngestPipelineConfig, StreamConfig, MaterializedView, MaterializedViewOptions, AggregatingMergeTreeEngine
+from app.datamodels.models import AircraftTrackingData, AircraftTrackingProcessed, AircraftSpeedAltitudeByCategory
 from app.functions.process_aircraft import transform_aircraft
 
+# Tracking data is partitioned by capture day and expires after 30 days
+TRACKING_RETENTION_DAYS = 30
+TRACKING_PARTITION_BY = "toYYYYMMDD(timestamp)"
+TRACKING_TTL = f"toDateTime(timestamp) + INTERVAL {TRACKING_RETENTION_DAYS} DAY"
+
 # Raw data ingest pipeline
-AircraftTrackingData_Table = OlapTable[AircraftTrackingData]("AircraftTrackingDataTable")
+AircraftTrackingData_Table = OlapTable[AircraftTrackingData]("AircraftTrackingDataTable", OlapConfig(
+    partition_by=TRACKING_PARTITION_BY,
+    ttl=TRACKING_TTL
+))
 
 AircraftTrackingData_Stream = Stream[AircraftTrackingData]("AircraftTrackingDataStream", StreamConfig(
     destination=AircraftTrackingData_Table
@@ -15,7 +23,17 @@ AircraftTrackingData_IngestAPI = IngestApi[AircraftTrackingData]("AircraftTracki
 ))
 
 # Derivative data model pipeline
-AircraftTrackingProcessed_Table = OlapTable[AircraftTrackingProcessed]("AircraftTrackingProcessedTable")
+# Sorted by the speed/altitude query's filter and group columns, with skip indexes for the rest
+AircraftTrackingProcessed_Table = OlapTable[AircraftTrackingProcessed]("AircraftTrackingProcessedTable", OlapConfig(
+    order_by_fields=["category", "alt_baro", "gs", "hex"],
+    primary_key_expression="(category, alt_baro)",
+    partition_by=TRACKING_PARTITION_BY,
+    ttl=TRACKING_TTL,
+    indexes=[
+        OlapConfig.TableIndex(name="idx_gs", expression="gs", type="minmax", granularity=4),
+        OlapConfig.TableIndex(name="idx_hex", expression="hex", type="bloom_filter", arguments=["0.01"], granularity=4),
+    ]
+))
 
 AircraftTrackingProcessed_Stream = Stream[AircraftTrackingProcessed]("AircraftTrackingProcessedStream", StreamConfig(
     destination=AircraftTrackingProcessed_Table
@@ -26,3 +44,46 @@ AircraftTrackingData_Stream.add_transform(
     AircraftTrackingProcessed_Stream,
     transform_aircraft
 )
+
+# Speed/altitude rollup per category, bucketed so API range filters can be served from it.
+# Split by capture day and expired with the tracking tables so both query paths cover the same window.
+ALTITUDE_BUCKET_FT = 500
+SPEED_BUCKET_KT = 25
+
+AircraftSpeedAltitudeByCategory_Table = OlapTable[AircraftSpeedAltitudeByCategory]("AircraftSpeedAltitudeByCategoryTable", OlapConfig(
+    engine=AggregatingMergeTreeEngine(),
+    order_by_fields=["category", "alt_baro_bucket_floor", "alt_baro_bucket_ceil", "gs_bucket_floor", "gs_bucket_ceil", "day"],
+    partition_by="toYYYYMMDD(day)",
+    ttl=f"day + INTERVAL {TRACKING_RETENTION_DAYS} DAY"
+))
+
+_processed = AircraftTrackingProcessed_Table.columns
+
+AircraftSpeedAltitudeByCategory_MV = MaterializedView[AircraftSpeedAltitudeByCategory](MaterializedViewOptions(
+    select_statement=f"""
+        SELECT
+            {_processed.category} as category,
+            toDate({_processed.timestamp}) as day,
+            floor({_processed.alt_baro} / {ALTITUDE_BUCKET_FT}) * {ALTITUDE_BUCKET_FT} as alt_baro_bucket_floor,
+            ceil({_processed.alt_baro} / {ALTITUDE_BUCKET_FT}) * {ALTITUDE_BUCKET_FT} as alt_baro_bucket_ceil,
+            floor({_processed.gs} / {SPEED_BUCKET_KT}) * {SPEED_BUCKET_KT} as gs_bucket_floor,
+            ceil({_processed.gs} / {SPEED_BUCKET_KT}) * {SPEED_BUCKET_KT} as gs_bucket_ceil,
+            countState() as records_state,
+            sumState(toFloat64({_processed.alt_baro})) as alt_baro_sum_state,
+            minState(toFloat64({_processed.alt_baro})) as alt_baro_min_state,
+            maxState(toFloat64({_processed.alt_baro})) as alt_baro_max_state,
+            varPopState(toFloat64({_processed.alt_baro})) as alt_baro_var_state,
+            sumState(toFloat64({_processed.gs})) as gs_sum_state,
+            minState(toFloat64({_processed.gs})) as gs_min_state,
+            maxState(toFloat64({_processed.gs})) as gs_max_state,
+            varPopState(toFloat64({_processed.gs})) as gs_var_state,
+            uniqState({_processed.hex}) as unique_aircraft_state
+        FROM {AircraftTrackingProcessed_Table.name}
+        WHERE {_processed.alt_baro} > 0
+            AND {_processed.gs} > 0
+            AND {_processed.category} != ''
+        GROUP BY category, day, alt_baro_bucket_floor, alt_baro_bucket_ceil, gs_bucket_floor, gs_bucket_ceil
+    """,
+    select_tables=[AircraftTrackingProcessed_Table],
+    materialized_view_name="AircraftSpeedAltitudeByCategory_MV"
+), target_table=AircraftSpeedAltitudeByCategory_Table)
@@ -4,7 +4,9 @@ from app.ingest.aircraft_tracking import (
     AircraftTrackingData_Stream,
     AircraftTrackingData_IngestAPI,
     AircraftTrackingProcessed_Table,
-    AircraftTrackingProcessed_Stream
+    AircraftTrackingProcessed_Stream,
+    AircraftSpeedAltitudeByCategory_Table,
+    AircraftSpeedAltitudeByCategory_MV
 )
 
 # Import APIs and workflows